@@ -17,16 +17,34 @@ La API devuelve objetos de tipo UserInDB, que contiene los siguientes campos:
 - certificado_N: un string que representa el certificado N del usuario.
 """
 
+import asyncio
 import uvicorn
 from fastapi import FastAPI, HTTPException, Depends
-from pydantic import BaseModel, EmailStr
-import sqlite3
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel, ConfigDict, EmailStr
+import aiosqlite
+import orjson
+from cachetools import TTLCache
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List
-from contextlib import contextmanager
+from contextlib import asynccontextmanager
+from datetime import date
+from typing import AsyncIterator, List
 from typing import Optional
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Abre las conexiones a la base de datos al iniciar la aplicación y las cierra
+    al apagarla.
+    """
+    await abrir_conexion()
+    try:
+        yield
+    finally:
+        await cerrar_conexion()
+
 app = FastAPI(
+    lifespan=lifespan,
     title="API de Usuarios",
     description="API para obtener información de usuarios",
     version="1.0.0"
@@ -48,42 +66,51 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-class UserCreate(BaseModel):
+class _UserFields(BaseModel):
     """
-    Clase para crear un nuevo usuario.
+    Clase base con los campos comunes a todos los modelos de usuario.
 
     Contiene los siguientes campos:
     - username: un string que representa el nombre de usuario.
-    - nacimiento: un string que representa la fecha de nacimiento en formato "YYYY-MM-DD".
+    - nacimiento: una fecha que representa la fecha de nacimiento, en formato "YYYY-MM-DD".
     - numero: un string que representa el número de teléfono.
     - gmail: un string que representa el correo electrónico del usuario.
     - profesion: un string que representa la profesión del usuario.
-    - certificado_N: un string que representa el certificado N del usuario.
     """
+    model_config = ConfigDict(defer_build=True, frozen=True, str_strip_whitespace=True)
+
     username: str
-    nacimiento: str
+    nacimiento: date
     numero: str
     gmail: EmailStr
     profesion: str
+
+class UserCreate(_UserFields):
+    """
+    Clase para crear un nuevo usuario.
+
+    Contiene los siguientes campos:
+    - username: un string que representa el nombre de usuario.
+    - nacimiento: una fecha que representa la fecha de nacimiento, en formato "YYYY-MM-DD".
+    - numero: un string que representa el número de teléfono.
+    - gmail: un string que representa el correo electrónico del usuario.
+    - profesion: un string que representa la profesión del usuario.
+    - certificado_N: un string que representa el certificado N del usuario.
+    """
     certificado_N: str
 
-class UserUpdate(BaseModel):
+class UserUpdate(_UserFields):
     """
     Clase para actualizar un usuario existente.
 
     Contiene los siguientes campos:
     - username: un string que representa el nombre de usuario.
-    - nacimiento: un string que representa la fecha de nacimiento en formato "YYYY-MM-DD".
+    - nacimiento: una fecha que representa la fecha de nacimiento, en formato "YYYY-MM-DD".
     - numero: un string que representa el número de teléfono.
     - gmail: un string que representa el correo electrónico del usuario.
     - profesion: un string que representa la profesión del usuario.
     - certificado_N: un string que representa el certificado N del usuario.
     """
-    username: str
-    nacimiento: str
-    numero: str
-    gmail: EmailStr
-    profesion: str
     certificado_N: Optional[str] = None
 
 class UserInDB(UserCreate):
@@ -93,113 +120,239 @@ class UserInDB(UserCreate):
     Contiene los siguientes campos:
     - id: un entero que representa el id del usuario en la base de datos.
     - username: un string que representa el nombre de usuario.
-    - nacimiento: un string que representa la fecha de nacimiento en formato "YYYY-MM-DD".
+    - nacimiento: una fecha que representa la fecha de nacimiento, en formato "YYYY-MM-DD".
     - numero: un string que representa el número de teléfono.
     - gmail: un string que representa el correo electrónico del usuario.
     - profesion: un string que representa la profesión del usuario.
-    - certificado_N: un string que representa el certificado N del usuario.
+    - certificado_N: un string que representa el certificado N del usuario, o
+      None si no tiene (la columna admite NULL y UserUpdate no lo exige).
     """
     id: int
+    certificado_N: Optional[str] = None
+
+# Caché de resultados de GET /users/{profesion}, indexada por profesión. Guarda
+# los usuarios ya serializados y se invalida al crear o editar usuarios.
+_prof_cache = TTLCache(maxsize=128, ttl=60)
+# Generación de la caché: cambia en cada invalidación para que una lectura que
+# empezó antes no guarde resultados ya obsoletos.
+_prof_cache_gen = 0
 
-@contextmanager
-def get_db_connection():
+# Serializa las transacciones de escritura sobre la conexión compartida.
+_write_lock = asyncio.Lock()
+
+INSERT_USUARIO_SQL = "INSERT INTO personas (nombre, nacimiento, numero, gmail, profesion, certificado_N) VALUES (?, ?, ?, ?, ?, ?)"
+
+def _usuario_row_factory(cursor, row) -> dict:
     """
-    Context manager para obtener una conexión a la base de datos.
+    Convierte una fila de personas directamente en el diccionario de UserInDB.
+    """
+    uid, uname, nac, num, gm, prof, cert = row
+    return {"id": uid, "username": uname, "nacimiento": nac, "numero": num, "gmail": gm, "profesion": prof, "certificado_N": cert}
 
-    La conexión se cierra automáticamente al salir del bloque with.
+def _invalidar_cache(profesion: Optional[str] = None) -> None:
     """
-    conn = sqlite3.connect("personas.db")
-    try:
-        yield conn
-    finally:
-        conn.close()
+    Invalida la caché de usuarios por profesión.
+
+    Si se indica una profesión solo se descarta esa entrada; si no, se vacía
+    toda la caché.
+    """
+    global _prof_cache_gen
+    _prof_cache_gen += 1
+    if profesion is None:
+        _prof_cache.clear()
+    else:
+        _prof_cache.pop(profesion, None)
+
+async def get_db() -> aiosqlite.Connection:
+    """
+    Dependencia que devuelve la conexión compartida de escritura.
+    """
+    return app.state.db
+
+async def get_db_lectura() -> aiosqlite.Connection:
+    """
+    Dependencia que devuelve la conexión compartida de solo lectura.
+
+    Al usar WAL, las lecturas por esta conexión nunca ven cambios de una
+    transacción de escritura que aún no hizo commit. Solo se usa para consultas
+    cortas; GET / abre su propia conexión.
+    """
+    return app.state.db_lectura
+
+async def conectar_lectura() -> aiosqlite.Connection:
+    """
+    Abre una conexión de solo lectura a la base de datos.
+    """
+    db = await aiosqlite.connect("file:personas.db?mode=ro", uri=True, isolation_level=None, cached_statements=256)
+    await db.executescript("""
+        PRAGMA temp_store=MEMORY;
+        PRAGMA cache_size=-64000;
+        PRAGMA mmap_size=268435456;
+    """)
+    return db
+
+async def abrir_conexion():
+    """
+    Abre las conexiones compartidas a la base de datos al iniciar la aplicación.
+
+    Se usa una conexión para escrituras y otra de solo lectura para las
+    consultas. Ambas se reutilizan en todas las peticiones y mantienen en caché
+    las sentencias SQL ya compiladas. También se activa el modo WAL y se crea el
+    índice que cubre las búsquedas por profesión.
+    """
+    app.state.db = await aiosqlite.connect("personas.db", isolation_level=None, cached_statements=256)
+    await app.state.db.executescript("""
+        PRAGMA journal_mode=WAL;
+        PRAGMA synchronous=NORMAL;
+        PRAGMA temp_store=MEMORY;
+        PRAGMA cache_size=-64000;
+        PRAGMA mmap_size=268435456;
+        CREATE INDEX IF NOT EXISTS idx_personas_profesion_cov
+            ON personas(profesion, id, nombre, nacimiento, numero, gmail, certificado_N);
+    """)
+    app.state.db_lectura = await conectar_lectura()
+
+async def cerrar_conexion():
+    """
+    Cierra las conexiones compartidas a la base de datos al apagar la aplicación.
+    """
+    await app.state.db_lectura.close()
+    await app.state.db.close()
+
+@asynccontextmanager
+async def transaccion(db: aiosqlite.Connection):
+    """
+    Context manager que agrupa escrituras en una transacción BEGIN IMMEDIATE.
+
+    Las transacciones se serializan sobre la conexión de escritura. Se hace
+    commit al salir del bloque with, o rollback (e invalidación de la caché) si
+    se produce una excepción, incluida una que ocurra en el BEGIN o en el
+    propio commit.
+    """
+    async with _write_lock:
+        try:
+            await db.execute("BEGIN IMMEDIATE")
+            yield db
+            await db.commit()
+        except BaseException:
+            # El rollback se encola detrás del BEGIN en el hilo de aiosqlite, así
+            # que también limpia un BEGIN cancelado que llegó a ejecutarse.
+            await asyncio.shield(db.rollback())
+            _invalidar_cache()
+            raise
 
-def nuevo_usuario(user: UserCreate) -> UserInDB:
+async def nuevo_usuario(db: aiosqlite.Connection, user: UserCreate) -> UserInDB:
     """
     Crea un nuevo usuario en la base de datos.
 
     Devuelve un objeto UserInDB que representa el usuario creado.
     """
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute(
-            "INSERT INTO personas (username, nacimiento, numero, gmail, profesion, certificado_N) VALUES (?, ?, ?, ?, ?, ?)",
-            (user.username, user.nacimiento, user.numero, user.gmail, user.profesion, user.certificado_N)
+    async with transaccion(db):
+        cursor = await db.execute(
+            INSERT_USUARIO_SQL,
+            (user.username, user.nacimiento.isoformat(), user.numero, user.gmail, user.profesion, user.certificado_N)
         )
         user_id = cursor.lastrowid
-        conn.commit()
-    return UserInDB(id=user_id, **user.dict())
-
-def obtener_usuarios() -> List[UserInDB]:
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM personas")
-        rows = cursor.fetchall()
-        for row in rows:
-            print(f"Row length: {len(row)}, Row content: {row}")
-            users = [UserInDB(id=row[0], username=row[1], nacimiento=row[2], numero=row[3], gmail=row[4], profesion=row[5], certificado_N=row[6])
-                     for row in rows]
-    return users
+    _invalidar_cache(user.profesion)
+    return UserInDB.model_construct(id=user_id, **user.__dict__)
 
-def obtener_usuarios_por_profesion(profesion: str) -> List[UserInDB]:
+async def crear_usuarios_bulk(db: aiosqlite.Connection, users: List[UserCreate]) -> None:
+    """
+    Crea varios usuarios en la base de datos en una sola transacción.
+    """
+    async with transaccion(db):
+        await db.executemany(
+            INSERT_USUARIO_SQL,
+            [(u.username, u.nacimiento.isoformat(), u.numero, u.gmail, u.profesion, u.certificado_N) for u in users]
+        )
+    _invalidar_cache()
+
+async def obtener_usuarios() -> AsyncIterator[bytes]:
+    """
+    Devuelve todos los usuarios como un array JSON generado por partes.
+
+    Las filas se leen en lotes de 512 para no cargar toda la tabla en memoria.
+    Usa su propia conexión, que se cierra al terminar, para que la instantánea
+    de lectura abierta durante el envío no afecte a las demás consultas.
+    """
+    db = await conectar_lectura()
+    try:
+        cursor = await db.execute("SELECT id, nombre, nacimiento, numero, gmail, profesion, certificado_N FROM personas")
+        cursor.row_factory = _usuario_row_factory
+        yield b"["
+        separador = b""
+        while batch := await cursor.fetchmany(512):
+            yield separador + orjson.dumps(batch)[1:-1]
+            separador = b","
+        yield b"]"
+    finally:
+        await db.close()
+
+async def obtener_usuarios_por_profesion(db: aiosqlite.Connection, profesion: str) -> List[dict]:
     """
     Devuelve una lista de usuarios con la profesión especificada.
+
+    Los resultados se guardan en caché por profesión durante 60 segundos.
     """
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM personas WHERE profesion = ?", (profesion,))
-        users = [UserInDB(id=row[0], username=row[1], nacimiento=row[2], numero=row[3], gmail=row[4], profesion=row[5], certificado_N=row[6])
-                 for row in cursor.fetchall()]
+    users = _prof_cache.get(profesion)
+    if users is not None:
+        return users
+    gen = _prof_cache_gen
+    cursor = await db.execute("SELECT id, nombre, nacimiento, numero, gmail, profesion, certificado_N FROM personas WHERE profesion = ?", (profesion,))
+    cursor.row_factory = _usuario_row_factory
+    users = await cursor.fetchall()
+    if gen == _prof_cache_gen:
+        _prof_cache[profesion] = users
     return users
 
-def editar_usuario(id: int, user: UserUpdate) -> UserInDB:
+async def editar_usuario(db: aiosqlite.Connection, id: int, user: UserUpdate) -> Optional[UserInDB]:
     """
     Actualiza un usuario existente en la base de datos.
 
-    Devuelve un objeto UserInDB que representa el usuario actualizado.
+    Devuelve un objeto UserInDB que representa el usuario actualizado, o None si
+    el usuario no existe.
     """
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute(
-            "UPDATE personas SET username=?, nacimiento=?, numero=?, gmail=?, profesion=?, certificado_N=? WHERE id=?",
-            (user.username, user.nacimiento, user.numero, user.gmail, user.profesion, user.certificado_N, id)
+    async with transaccion(db):
+        cursor = await db.execute(
+            "UPDATE personas SET nombre=?, nacimiento=?, numero=?, gmail=?, profesion=?, certificado_N=? WHERE id=?",
+            (user.username, user.nacimiento.isoformat(), user.numero, user.gmail, user.profesion, user.certificado_N, id)
         )
-        if cursor.rowcount == 0:
-            raise HTTPException(status_code=404, detail="Usuario no encontrado")
-        conn.commit()
-    return UserInDB(id=id, **user.dict())
+    if cursor.rowcount == 0:
+        return None
+    _invalidar_cache()
+    return UserInDB.model_construct(id=id, **user.__dict__)
 
 @app.get("/", response_model=List[UserInDB], tags=["Usuarios"])
 async def obtener_todos_los_usuarios():
     """
     Devuelve una lista de todos los usuarios en la base de datos.
     """
-    return obtener_usuarios()
+    return StreamingResponse(obtener_usuarios(), media_type="application/json")
 
 @app.get("/users/{profesion}", response_model=List[UserInDB], tags=["Usuarios"])
-async def obtener_usuarios_por_profesion_route(profesion: str):
+async def obtener_usuarios_por_profesion_route(profesion: str, db: aiosqlite.Connection = Depends(get_db_lectura)):
     """
     Devuelve una lista de usuarios con la profesión especificada.
 
     Si no se encontraron usuarios con la profesión especificada, se devuelve un
     error 404.
     """
-    users = obtener_usuarios_por_profesion(profesion)
+    users = await obtener_usuarios_por_profesion(db, profesion)
     if not users:
         raise HTTPException(status_code=404, detail="No se encontraron usuarios con esta profesión")
-    return users
+    return Response(orjson.dumps(users), media_type="application/json")
 
 @app.post("/users", response_model=UserInDB, tags=["Usuarios"])
-async def crear_nuevo_usuario(user: UserCreate):
+async def crear_nuevo_usuario(user: UserCreate, db: aiosqlite.Connection = Depends(get_db)):
     """
     Crea un nuevo usuario en la base de datos.
 
     Devuelve el usuario creado en formato UserInDB.
     """
-    return nuevo_usuario(user)
+    return await nuevo_usuario(db, user)
 
 @app.put("/users/{id}", response_model=UserInDB, tags=["Usuarios"])
-async def editar_usuario_route(id: int, user: UserUpdate):
+async def editar_usuario_route(id: int, user: UserUpdate, db: aiosqlite.Connection = Depends(get_db)):
     """
     Actualiza un usuario existente en la base de datos.
 
@@ -207,12 +360,10 @@ async def editar_usuario_route(id: int, user: UserUpdate):
 
     Si el usuario no existe, se devuelve un error 404.
     """
-    try:
-        return editar_usuario(id, user)
-    except HTTPException as e:
-        raise e
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    updated = await editar_usuario(db, id, user)
+    if updated is None:
+        raise HTTPException(status_code=404, detail="Usuario no encontrado")
+    return updated
 
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
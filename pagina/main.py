@@ -1,11 +1,20 @@
 from flask import Flask, render_template, request, redirect, url_for
 import requests
-import json
+import orjson
+import atexit
+import logging
+import os
+import queue
+import threading
 
 app = Flask(__name__)
+logger = logging.getLogger(__name__)
 
 API_URL = "http://localhost:8002"  # Asegúrate de que esta URL coincida con la de tu API
 
+# Sesión compartida para reutilizar las conexiones HTTP con la API
+_http = requests.Session()
+
 # @app.route('/')
 # def index():
 #     response = requests.get(f"{API_URL}/users")
@@ -17,47 +26,86 @@ API_URL = "http://localhost:8002"  # Asegúrate de que esta URL coincida con la
 
 @app.route('/users/<profesion>')
 def users_by_profession(profesion):
-    response = requests.get(f"{API_URL}/users/{profesion}")
+    response = _http.get(f"{API_URL}/users/{profesion}", timeout=5)
     if response.status_code == 200:
-        users = response.json()
+        users = orjson.loads(response.content)
         return render_template('users_by_profession.html', users=users, profesion=profesion)
     else:
         return "Error al obtener los usuarios por profesión", 500
 
 users = []
+_users_lock = threading.Lock()
+_users_queue = queue.Queue()
+
+def escribir_usuarios(snapshot):
+    """
+    Escribe users.json en un archivo temporal y luego lo reemplaza, para no
+    dejarlo a medias. Los errores se registran sin detener al hilo escritor.
+    """
+    try:
+        with open('users.json.tmp', 'wb') as f:
+            f.write(orjson.dumps(snapshot))
+        os.replace('users.json.tmp', 'users.json')
+    except OSError:
+        logger.exception("No se pudo guardar users.json")
+
+def guardar_usuarios():
+    """
+    Único hilo que escribe users.json, en el orden en que se encolan las copias.
+
+    Si hay varias copias pendientes solo se escribe la más reciente. Un None en
+    la cola indica que hay que terminar después de escribir lo pendiente.
+    """
+    while True:
+        snapshot = _users_queue.get()
+        terminar = snapshot is None
+        while not _users_queue.empty():
+            siguiente = _users_queue.get_nowait()
+            if siguiente is None:
+                terminar = True
+            else:
+                snapshot = siguiente
+        if snapshot is not None:
+            escribir_usuarios(snapshot)
+        if terminar:
+            return
+
+_writer = threading.Thread(target=guardar_usuarios, daemon=True)
+_writer.start()
+
+@atexit.register
+def _vaciar_cola_usuarios():
+    _users_queue.put(None)
+    _writer.join()
 
 @app.route('/add_user', methods=['GET', 'POST'])
 def add_user():
     if request.method == 'POST':
         new_user = {
-            "id": int(request.form['id']),
             "username": request.form['username'],
             "nacimiento": request.form['nacimiento'],
             "numero": request.form['numero'],
             "gmail": request.form['gmail'],
-            "profesion": request.form['profesion']
+            "profesion": request.form['profesion'],
+            "certificado_N": request.form['certificado_N']
         }
-        print("Tipo de nuevo usuario:", type(new_user))
-        print("Nuevo usuario añadido:", new_user)
+        logger.debug("Nuevo usuario añadido: %s", new_user)
         url = f'{API_URL}/users'
-        response = requests.post(url, json=new_user)
-        return response.json()
-        users.append(new_user)
-        
-        # Guardar en un archivo JSON
-        with open('users.json', 'w') as f:
-            json.dump(users, f)
-        
+        response = _http.post(url, json=new_user, timeout=5)
+        if response.status_code != 200:
+            return response.content, response.status_code, {"Content-Type": response.headers.get("Content-Type", "application/json")}
+
+        # Guardar en un archivo JSON en segundo plano
+        with _users_lock:
+            users.append(orjson.loads(response.content))
+            _users_queue.put(list(users))
+
         return redirect(url_for('index'))
     return render_template('add_user.html')
 
 @app.route('/')
 def index():
-    print("Tipo de users:", type(users))
-    print("Contenido de users:", users)
-    for user in users:
-        print("Tipo de usuario:", type(user))
-        print("Contenido de usuario:", user)
+    logger.debug("Contenido de users: %s", users)
     return render_template('index.html', users=users)
 
 
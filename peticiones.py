@@ -1,19 +1,21 @@
 import requests
-import reflex as rx
+
+# Sesión compartida para reutilizar las conexiones HTTP con la API
+_http = requests.Session()
 
 def obtener_todos_los_usuarios():
     url = 'http://localhost:8000/users'
-    response = requests.get(url)
+    response = _http.get(url, timeout=5)
     return response.json()
 
 def obtener_usuarios_por_profesion(profesion):
     url = f'http://localhost:8000/users/{profesion}'
-    response = requests.get(url)
+    response = _http.get(url, timeout=5)
     return response.json()
 
 def nuevo_usuario(user):
     url = 'http://localhost:8000/users'
-    response = requests.post(url, json=user)
+    response = _http.post(url, json=user, timeout=5)
     return response.json()
 
 user = {